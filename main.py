@@ -17,10 +17,14 @@ Translated and modified by github user @MxPerrot
 
 
 import argparse
+import math
 import sounddevice as sd
 import numpy as np
+from bisect import bisect_left
+from collections.abc import Callable
+from fractions import Fraction
 from time import sleep
-from utils.keyutils import keys_dict, keyboard
+from utils.keyutils import keys_bitmask, keyboard
 
 
 ###############################################################################
@@ -34,9 +38,28 @@ def get_readable_keys(keys) -> list[str]:
     Returns:
         List of readable key names.
     """
-    return [k.name if hasattr(k, 'name') else str(k.char) for k in keys]
+    return [getattr(k, 'name', None) or k.char for k in keys]
 
 
+def parse_latency(value: str) -> str | float:
+    """Parse the audio stream latency argument.
+    Args:
+        value: 'low', 'high' or a latency in seconds.
+    Returns:
+        The latency accepted by sounddevice.
+    Raises:
+        argparse.ArgumentTypeError: If the latency is invalid.
+    """
+    if value in ('low', 'high'):
+        return value
+    try:
+        latency = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid latency: {value!r}") from None
+    if not (math.isfinite(latency) and latency > 0):
+        raise argparse.ArgumentTypeError(f"latency must be a positive number of seconds: {value!r}")
+    return latency
+
 def choose_device(devices) -> int:
     """Display available audio devices and allow the user to select one.
     Returns:
@@ -64,62 +87,107 @@ def on_press(key: str) -> None:
     Args:
         key: The key that was pressed.
     """
-    if key in keys:
-        keys[key] = True
+    global key_state
+    bit = KEY_BITS.get(key)
+    if bit:
+        key_state |= bit
 
 def on_release(key: str) -> None:
     """Handle key release events to disable audio generation.
     Args:
         key: The key that was released.
     """
-    if key in keys:
-        keys[key] = False
+    global key_state
+    bit = KEY_BITS.get(key)
+    if bit:
+        key_state &= ~bit
 
-def generate_audio(num_samples: int, offset: float = 0) -> tuple[np.ndarray, float]:
-    """Generate a sine wave audio signal.
+def wave_table(frequency: float, samplerate: int, volume: float, amplitudes: list[float] | tuple[float, ...] = (1.0,), max_periods: int = 64, min_samples: int = 0) -> tuple[np.ndarray, list[int]]:
+    """Precompute a looping wave table from a fundamental sine wave and its harmonics.
+    The table holds a whole number of periods so that it can be played back in a loop without discontinuity.
     Args:
-        num_samples: Number of samples to generate.
-        offset: Offset in seconds for the sine wave.
+        frequency: Frequency of the fundamental in Hz.
+        samplerate: Sample rate for audio output.
+        volume: Volume of the wave, an upper bound on its peak amplitude.
+        amplitudes: Relative amplitudes of the fundamental and the following harmonics.
+        max_periods: Maximum number of periods needed to fit the frequency.
+        min_samples: Minimum length of the table, reached by repeating the periods.
     Returns:
-        A tuple containing the generated audio signal and the updated offset.
+        A tuple containing the wave table and the sample indices at which each period starts.
+    Raises:
+        ValueError: If the amplitudes are all zero or not finite, or if a harmonic is not below the Nyquist frequency.
     """
-    t = np.linspace(offset, num_samples / SAMPLERATE + offset, num_samples, endpoint=False)
-    offset += num_samples / SAMPLERATE
-    while offset >= 1 / FREQUENCY:
-        offset -= 1 / FREQUENCY
-    audio = np.sin(2 * np.pi * FREQUENCY * t) * VOLUME
-    audio = np.tile(audio[:, np.newaxis], (1, CHANNELS))
-    return audio, offset
-
-def audio_callback(outdata: np.ndarray, frames: int, time: float, status: sd.CallbackFlags) -> None:
-    """Callback function for audio output.
+    amplitudes = np.asarray(amplitudes, dtype=np.float64)
+    if not np.all(np.isfinite(amplitudes)) or not np.any(amplitudes):
+        raise ValueError("Harmonic amplitudes must be finite and not all zero")
+    harmonics = np.arange(1, len(amplitudes) + 1)[:, np.newaxis]
+    aliased = harmonics[(amplitudes != 0) & (harmonics[:, 0] * frequency >= samplerate / 2)]
+    if len(aliased):
+        raise ValueError(f"Harmonic {aliased[0, 0]} ({aliased[0, 0] * frequency} Hz) is not below the Nyquist frequency ({samplerate / 2} Hz)")
+    ratio = Fraction(samplerate / frequency).limit_denominator(max_periods)
+    repeats = -(-min_samples // ratio.numerator) or 1
+    period_samples, periods = ratio.numerator * repeats, ratio.denominator * repeats
+    t = periods * np.arange(period_samples)[np.newaxis, :] / period_samples
+    wave = (amplitudes[:, np.newaxis] * np.sin(2 * np.pi * harmonics * t)).sum(axis=0)
+    table = (volume / np.abs(amplitudes).sum() * wave).astype(np.float32)
+    cycle_starts = [-(-i * period_samples // periods) for i in range(periods + 1)]
+    return table, cycle_starts
+
+def generate_audio(out: np.ndarray, phase_idx: int = 0) -> int:
+    """Write a wave table signal to every channel of an output buffer.
+    Args:
+        out: Output buffer to fill, at most as long as the wave table.
+        phase_idx: Current sample index in the wave table.
+    Returns:
+        The updated sample index.
+    """
+    num_samples = len(out)
+    head = min(num_samples, len(TABLE) - phase_idx)  # Samples left before the table wraps
+    out[:head] = TABLE[phase_idx:phase_idx + head, np.newaxis]
+    out[head:] = TABLE[:num_samples - head, np.newaxis]
+    return (phase_idx + num_samples) % len(TABLE)
+
+def synth_block(outdata: np.ndarray, phase_idx: int, key_on: bool) -> int:
+    """Fill an output block with tone or silence.
     Args:
         outdata: Output buffer for audio data.
-        frames: Number of frames to write.
-        time: Timestamp of the audio callback.
-        status: Status of the audio stream.
+        phase_idx: Current sample index in the wave table.
+        key_on: Whether all tracked keys are pressed.
+    Returns:
+        The updated sample index.
+    """
+    if key_on:  # Key pressed → Normal tone
+        return generate_audio(outdata, phase_idx)
+    # Key released → Clean ending with last wave period
+    stop = CYCLE_STARTS[bisect_left(CYCLE_STARTS, phase_idx)]  # Start of the next wave period
+    num = min(stop - phase_idx, len(outdata))  # Remaining samples, limited to frames
+    outdata[num:].fill(0.0)  # Silence after the wave period
+    return generate_audio(outdata[:num], phase_idx)  # Write signal at the start
+
+def make_audio_callback(phase_idx: int = 0) -> Callable[..., None]:
+    """Create the callback function for audio output.
+    The wave table sample index is kept in the closure rather than in a global.
+    Args:
+        phase_idx: Initial sample index in the wave table.
+    Returns:
+        The audio callback to pass to the output stream.
     """
+    state = [phase_idx]
 
-    global offset
-    if status:
-        print(status)
-
-    if all(keys.values()):  # Key pressed → Normal tone
-        audio, offset = generate_audio(frames, offset)
-        outdata[:] = audio
-    else:  # Key released → Clean ending with last wave period
-        outdata[:] = np.zeros((frames, CHANNELS), dtype=np.float32)  # Default: silence
-        if offset != 0:
-            num = int(((1 / FREQUENCY) - offset) * SAMPLERATE)  # Calculate remaining samples
-            
-            if num == 0:
-                offset = 0
-                return
-            if num > frames:
-                num = frames  # Limit if num is greater than frames
-            audio, new_offset = generate_audio(num, offset)  # Only take audio, ignore offset
-            outdata[:num] = audio  # Write signal at the start 
-            offset = max(0, new_offset)  # Reset offset
+    def audio_callback(outdata: np.ndarray, frames: int, time: float, status: sd.CallbackFlags) -> None:
+        """Callback function for audio output.
+        Args:
+            outdata: Output buffer for audio data.
+            frames: Number of frames to write.
+            time: Timestamp of the audio callback.
+            status: Status of the audio stream.
+        """
+        if status:
+            print(status)
+
+        state[0] = synth_block(outdata, state[0], key_state == FULL_MASK)
+
+    return audio_callback
 
 ###############################################################################
 #                                MAIN FUNCTION                                #
@@ -130,9 +198,12 @@ if __name__ == "__main__":
     # Default parameters
     FREQUENCY = 440.0  # Frequency of the sine wave in Hz
     VOLUME = 0.5  # Volume of the sine wave
+    HARMONICS = [1.0]  # Relative amplitudes of the fundamental and its harmonics
     KEYS = ['shift_r']  # Default keys to control audio
     SAMPLERATE = 44100  # Sample rate for audio output
     CHANNELS = 2  # Number of audio channels
+    BLOCKSIZE = 256  # Frames per audio callback, minimum length of the wave table
+    LATENCY = 'low'  # Audio output latency, higher values buffer more blocks ahead
     output_device = None  # Audio output device index, None for auto-select
     DEVICES = sd.query_devices()
 
@@ -143,8 +214,10 @@ if __name__ == "__main__":
     parser.add_argument('-k', '--keys', nargs='+', default=KEYS, help='Keys to simultaneously press to generate sound (default: shift_r)')
     parser.add_argument('-f', '--frequency', type=float, default=FREQUENCY, help='Frequency of the sine wave in Hz (default: 440.0)')
     parser.add_argument('-v', '--volume', type=float, default=VOLUME, help='Volume of the sine wave (default: 0.5)')
+    parser.add_argument('-H', '--harmonics', type=float, nargs='+', default=HARMONICS, help='Relative amplitudes of the fundamental and its harmonics (default: 1.0, pure sine wave)')
     parser.add_argument('-s', '--samplerate', type=int, default=44100, help='Sample rate for audio output (default: 44100)')
     parser.add_argument('-c', '--channels', type=int, default=2, help='Number of audio channels (default: 2)')
+    parser.add_argument('-L', '--latency', type=parse_latency, default=LATENCY, help="Audio output latency: 'low', 'high' or seconds, raise it if the sound crackles (default: low)")
     args = parser.parse_args()
 
     # Parameters
@@ -152,11 +225,13 @@ if __name__ == "__main__":
     KEYS = args.keys
     FREQUENCY = args.frequency
     VOLUME = args.volume
+    HARMONICS = args.harmonics
     SAMPLERATE = args.samplerate
     CHANNELS = args.channels
+    LATENCY = args.latency
     
-    keys = keys_dict(KEYS)  # Dictionary to track key states
-    offset = 0.0  # Offset for the sine wave generation
+    KEY_BITS, FULL_MASK = keys_bitmask(KEYS)  # Bit flag of each tracked key
+    key_state = 0  # Bitmask of the tracked keys currently pressed, only written by the listener thread
 
     # List available audio devices if requested
     if args.list_devices:
@@ -165,6 +240,11 @@ if __name__ == "__main__":
             print(f"  {i}: {device['name']}")
         exit(0)
 
+    try:
+        TABLE, CYCLE_STARTS = wave_table(FREQUENCY, SAMPLERATE, VOLUME, HARMONICS, min_samples=BLOCKSIZE)  # Precomputed wave periods
+    except ValueError as e:
+        parser.error(str(e))
+
     # Choose audio output device if not specified
     if OUTPUT_DEVICE is None:
         OUTPUT_DEVICE = choose_device(DEVICES)
@@ -176,17 +256,17 @@ if __name__ == "__main__":
 
     try:
         with sd.OutputStream(
-            callback    = audio_callback,
+            callback    = make_audio_callback(),
             device      = output_device,
             samplerate  = SAMPLERATE,
             channels    = CHANNELS,
             dtype       = np.float32,
             finished_callback = finished_callback,
-            blocksize   = 256,
-            latency     = 'low',
+            blocksize   = BLOCKSIZE,
+            latency     = LATENCY,
         ):
 
-            readable_keys = get_readable_keys(keys)
+            readable_keys = get_readable_keys(KEY_BITS)
             print(f"Hold {' & '.join(readable_keys)} to beep")
 
             try:
@@ -196,7 +276,7 @@ if __name__ == "__main__":
                 print("\nProgram ended")
                 listener.stop()
     except Exception as e:
-        print(f"Could not start audio stream: {e}. Parameters: device={OUTPUT_DEVICE}, samplerate={SAMPLERATE}, channels={CHANNELS}, dtype=np.float32, blocksize=256, latency='low'")
+        print(f"Could not start audio stream: {e}. Parameters: device={OUTPUT_DEVICE}, samplerate={SAMPLERATE}, channels={CHANNELS}, dtype=np.float32, blocksize={BLOCKSIZE}, latency={LATENCY!r}")
         listener.stop()
     finally:
         listener.stop()